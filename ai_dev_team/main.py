@@ -1,21 +1,55 @@
+import difflib
+import functools
+import gzip
+import hashlib
 import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 import json
 import requests
+from requests.adapters import HTTPAdapter
 from typing import TypedDict, Dict, Any, List
 
 from dotenv import load_dotenv
 
+# orjson is 2-5x faster than stdlib json and encodes straight to bytes
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # LangGraph
 from langgraph.graph import StateGraph, END
 
+
+def _json_dumps(obj, sort_keys: bool = False) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode("utf-8")
+        except Exception:
+            pass  # stdlib handles the exotic types orjson rejects
+    return json.dumps(obj, sort_keys=sort_keys)
+
+
+def _json_loads(text):
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except Exception:
+            pass  # stdlib is more lenient (accepts NaN/Infinity)
+    return json.loads(text)
+
 # Local tools (support both package and script execution)
 try:
-    from .tools.file_tools import ensure_outputs_dir, write_file_to_outputs
+    from .tools.file_tools import ensure_outputs_dir, write_file_to_outputs, write_files_bulk
     from .tools.metrics import write_prd, write_qa_log, write_metrics
+    from .tools import llm_cache, semantic_cache
 except ImportError:  # Running as script: `python -m main` from inside folder
-    from tools.file_tools import ensure_outputs_dir, write_file_to_outputs
+    from tools.file_tools import ensure_outputs_dir, write_file_to_outputs, write_files_bulk
     from tools.metrics import write_prd, write_qa_log, write_metrics
+    from tools import llm_cache, semantic_cache
 
 
 # Ensure we load the .env from the repository root deterministically
@@ -30,40 +64,157 @@ except Exception:
     load_dotenv()
 
 
-class MultiLLM:
-    def __init__(self, env_prefix: str):
-        # Primary provider config
-        self.provider = os.getenv(f"{env_prefix}_PROVIDER", "openrouter")
-        self.model_name = os.getenv(f"{env_prefix}_MODEL", "openrouter/auto:free")
-        self.api_key = os.getenv(f"{env_prefix}_API_KEY", os.getenv("OPENROUTER_API_KEY"))
-        self.base_url = os.getenv(
+# Shared pooled HTTP session so repeated LLM calls reuse TCP+TLS connections
+# instead of paying a fresh handshake per request.
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    return session
+
+
+_HTTP_SESSION = _build_session()
+
+
+# Bodies above this size get gzip-compressed before upload; generated
+# HTML/CSS/JS payloads are highly compressible, so this roughly halves the
+# bytes on the wire for the large QA-iteration requests.
+_GZIP_MIN_BYTES = 4096
+
+
+def _maybe_compress_body(data: str, headers: Dict[str, str]):
+    if len(data) <= _GZIP_MIN_BYTES:
+        return data, headers
+    return (gzip.compress(data.encode("utf-8"), compresslevel=1),
+            {**headers, "Content-Encoding": "gzip"})
+
+
+# Transient statuses worth retrying before falling back to another provider
+_RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+def _post_with_retry(url, headers, data, timeout=120, stream=False,
+                     max_attempts=4, base=0.5, cap=8.0):
+    """POST with exponential backoff and full jitter on transient failures.
+
+    Retries connection errors and 429/5xx responses, sleeping
+    random(0, min(cap, base * 2**attempt)) between attempts so concurrent
+    clients don't retry in lockstep. The final response is returned as-is;
+    callers still raise_for_status on it.
+    """
+    last_exc = None
+    response = None
+    for attempt in range(max_attempts):
+        if attempt:
+            time.sleep(random.uniform(0, min(cap, base * (2 ** attempt))))
+        try:
+            response = _HTTP_SESSION.post(url, headers=headers, data=data, timeout=timeout, stream=stream)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            last_exc = e
+            continue
+        if response.status_code in _RETRYABLE_STATUS and attempt < max_attempts - 1:
+            continue
+        return response
+    if response is not None:
+        return response
+    raise last_exc
+
+
+def _iter_sse_content(response):
+    """Yield content deltas from an OpenAI-style SSE chat-completions stream."""
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return
+        try:
+            event = _json_loads(payload)
+        except Exception:
+            continue
+        choices = event.get("choices") or []
+        if not choices:
+            continue
+        delta = choices[0].get("delta") or {}
+        piece = delta.get("content")
+        if piece:
+            yield piece
+        if choices[0].get("finish_reason"):
+            return
+
+
+# Background pool for best-effort artifact/log writes so disk I/O overlaps
+# with LLM round trips instead of serializing after them.
+_IO_POOL = ThreadPoolExecutor(max_workers=4)
+
+# Dedicated pool for racing provider calls; kept separate from _IO_POOL so
+# long-blocking HTTP requests never starve the artifact writes.
+_LLM_POOL = ThreadPoolExecutor(max_workers=4)
+
+
+@functools.lru_cache(maxsize=None)
+def _agent_cfg(env_prefix: str):
+    """Resolve and parse all env-driven config for one agent prefix once."""
+    return (
+        os.getenv(f"{env_prefix}_PROVIDER", "openrouter"),
+        os.getenv(f"{env_prefix}_MODEL", "openrouter/auto:free"),
+        os.getenv(f"{env_prefix}_API_KEY", os.getenv("OPENROUTER_API_KEY")),
+        os.getenv(
             f"{env_prefix}_BASE_URL",
             os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1/chat/completions")
-        )
-        self.max_tokens = int(os.getenv(f"{env_prefix}_MAX_TOKENS", os.getenv("OPENROUTER_MAX_TOKENS", "1200")))
-        self.temperature = float(os.getenv(f"{env_prefix}_TEMPERATURE", os.getenv("OPENROUTER_TEMPERATURE", "0.2")))
+        ),
+        int(os.getenv(f"{env_prefix}_MAX_TOKENS", os.getenv("OPENROUTER_MAX_TOKENS", "1200"))),
+        float(os.getenv(f"{env_prefix}_TEMPERATURE", os.getenv("OPENROUTER_TEMPERATURE", "0.2"))),
+        float(os.getenv(f"{env_prefix}_TIMEOUT", os.getenv("LLM_TIMEOUT", "20"))),
+    )
 
-        # Fallback to Google Gemini (free tier) if primary fails
-        self.gemini_api_key = os.getenv("GEMINI_API_KEY")
-        self.gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
-    def _invoke_openrouter(self, messages: List[Dict[str, Any]]) -> str:
-        if not self.api_key:
-            raise RuntimeError("OPENROUTER_API_KEY is not set in environment.")
-        headers = {
+class MultiLLM:
+    # First (model, api_version) pair that answered successfully; shared
+    # across instances so later calls skip the probing ladder entirely
+    _gemini_working = None
+
+    def __init__(self, env_prefix: str):
+        # Primary provider config (memoized per prefix so repeated
+        # instantiation, e.g. in tests, skips the getenv/parse work)
+        # A timeout near provider median latency plus the retry helper beats
+        # waiting out 120 s stragglers; override per agent via <PREFIX>_TIMEOUT.
+        (self.provider, self.model_name, self.api_key, self.base_url,
+         self.max_tokens, self.temperature, self.timeout) = _agent_cfg(env_prefix)
+
+        # Request headers are constant per instance; build them once instead
+        # of on every call
+        self._headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "Accept": "application/json",
+        }
+        self._openrouter_headers = {
+            **self._headers,
             "HTTP-Referer": os.getenv("OPENROUTER_HTTP_REFERER", "http://localhost"),
             "X-Title": os.getenv("OPENROUTER_APP_TITLE", "Generative AI Product Development Team"),
         }
-        data = json.dumps({
+
+        # Fallback to Google Gemini (free tier) if primary fails
+        self.gemini_api_key = os.getenv("GEMINI_API_KEY")
+        self.gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+    def _invoke_openrouter(self, messages: List[Dict[str, Any]], on_delta=None) -> str:
+        if not self.api_key:
+            raise RuntimeError("OPENROUTER_API_KEY is not set in environment.")
+        headers = self._openrouter_headers
+        body: Dict[str, Any] = {
             "model": self.model_name,
             "messages": messages,
             "max_tokens": self.max_tokens,
             "temperature": self.temperature,
-        })
-        response = requests.post(self.base_url, headers=headers, data=data, timeout=120)
+        }
+        if on_delta is not None:
+            body["stream"] = True
+        data, headers = _maybe_compress_body(_json_dumps(body), headers)
+        response = _post_with_retry(self.base_url, headers=headers, data=data, timeout=self.timeout, stream=on_delta is not None)
         try:
             response.raise_for_status()
         except requests.HTTPError as e:
@@ -73,39 +224,51 @@ class MultiLLM:
             except Exception:
                 detail = response.text
             if response.status_code == 402:
-                for reduced in (96, 64, 48):
-                    try:
-                        data2 = json.dumps({
-                            "model": self.model_name,
-                            "messages": messages,
-                            "max_tokens": reduced,
-                            "temperature": self.temperature,
-                        })
-                        response3 = requests.post(self.base_url, headers=headers, data=data2, timeout=120)
+                # Single reduced-budget streaming retry instead of three
+                # sequential full round trips at shrinking max_tokens: stream
+                # at the largest reduced budget and stop as soon as the model
+                # finishes (or the stream ends).
+                try:
+                    # Compress the retry body independently: `headers` above
+                    # may carry Content-Encoding: gzip for the original
+                    # (larger) body, which must not leak onto this one
+                    data2, headers2 = _maybe_compress_body(_json_dumps({
+                        "model": self.model_name,
+                        "messages": messages,
+                        "max_tokens": 96,
+                        "temperature": self.temperature,
+                        "stream": True,
+                    }), self._openrouter_headers)
+                    with _post_with_retry(self.base_url, headers=headers2, data=data2, timeout=self.timeout, stream=True) as response3:
                         response3.raise_for_status()
-                        return response3.json()["choices"][0]["message"]["content"]
-                    except Exception:
-                        continue
+                        reduced_content = "".join(_iter_sse_content(response3))
+                    if reduced_content:
+                        return reduced_content
+                except Exception:
+                    pass
             raise requests.HTTPError(f"OpenRouter request failed: {e}; detail: {detail}") from e
+        if on_delta is not None:
+            chunks: List[str] = []
+            for piece in _iter_sse_content(response):
+                on_delta(piece)
+                chunks.append(piece)
+            return "".join(chunks)
         return response.json()["choices"][0]["message"]["content"]
 
     def _invoke_openai_compatible(self, messages: List[Dict[str, Any]]) -> str:
         # For providers like DeepSeek or other OpenAI-compatible endpoints
         if not self.api_key:
             raise RuntimeError(f"{self.provider} API key is not set.")
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
+        headers = self._headers
         url = self.base_url or "https://api.deepseek.com/chat/completions"
-        data = json.dumps({
+        data = _json_dumps({
             "model": self.model_name,
             "messages": messages,
             "max_tokens": self.max_tokens,
             "temperature": self.temperature,
         })
-        response = requests.post(url, headers=headers, data=data, timeout=120)
+        data, headers = _maybe_compress_body(data, headers)
+        response = _post_with_retry(url, headers=headers, data=data, timeout=self.timeout)
         response.raise_for_status()
         return response.json()["choices"][0]["message"]["content"]
 
@@ -131,16 +294,27 @@ class MultiLLM:
 
         def try_call(model_id: str, version: str) -> str:
             url = f"https://generativelanguage.googleapis.com/{version}/models/{model_id}:generateContent?key={self.gemini_api_key}"
-            payload = json.dumps({"contents": contents})
-            resp = requests.post(url, headers=headers, data=payload, timeout=120)
+            payload = _json_dumps({"contents": contents})
+            resp = _post_with_retry(url, headers=headers, data=payload, timeout=self.timeout)
             resp.raise_for_status()
+            # Remember the pair that worked so future invocations go straight
+            # to it instead of re-walking the fallback ladder
+            MultiLLM._gemini_working = (model_id, version)
             data = resp.json()
             candidates = data.get("candidates", [])
             if candidates:
                 parts = candidates[0].get("content", {}).get("parts", [])
                 if parts:
                     return parts[0].get("text", "")
-            return json.dumps(data)
+            return _json_dumps(data)
+
+        # Go straight to a previously working (model, version) pair
+        if MultiLLM._gemini_working is not None:
+            known_model, known_version = MultiLLM._gemini_working
+            try:
+                return try_call(known_model, known_version)
+            except requests.HTTPError:
+                MultiLLM._gemini_working = None
 
         # Try user-configured model and version
         try:
@@ -163,30 +337,103 @@ class MultiLLM:
         # If all fail, re-raise a generic error
         raise requests.HTTPError("Gemini request failed after retries.")
 
-    def invoke(self, messages: List[Dict[str, Any]]):
+    def _invoke_primary(self, messages: List[Dict[str, Any]], on_delta=None) -> str:
+        provider_lower = self.provider.lower()
+        if provider_lower == "openrouter":
+            return self._invoke_openrouter(messages, on_delta=on_delta)
+        if provider_lower in ("deepseek", "openai-compatible", "openai"):
+            return self._invoke_openai_compatible(messages)
+        if provider_lower in ("google-gemini", "gemini", "google"):
+            return self._invoke_gemini(messages)
+        return self._invoke_openai_compatible(messages)
+
+    def _invoke_racing(self, messages: List[Dict[str, Any]]) -> str:
+        """Dispatch the primary provider and the Gemini fallback concurrently
+        and return the first non-empty response.
+
+        When a provider stalls, the pipeline no longer waits out its full
+        timeout before even starting the fallback call.
+        """
+        pending = {
+            _LLM_POOL.submit(self._invoke_primary, messages),
+            _LLM_POOL.submit(self._invoke_gemini, messages),
+        }
+        last_error: Exception = RuntimeError("No provider produced a response.")
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    candidate = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if isinstance(candidate, str) and candidate.strip():
+                    for remaining in pending:
+                        remaining.cancel()
+                    return candidate
+        raise last_error
+
+    def _cache_key(self, messages: List[Dict[str, Any]]) -> str:
+        payload = _json_dumps({
+            "p": self.provider,
+            "m": self.model_name,
+            "t": self.temperature,
+            "mx": self.max_tokens,
+            "msgs": messages,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def invoke(self, messages: List[Dict[str, Any]], on_delta=None):
+        # Exact-match response cache: identical prompts (re-runs, repeated QA
+        # loops) skip the HTTP call entirely. Only used at low temperature
+        # where responses are near-deterministic anyway.
+        cache_key = None
+        if llm_cache.is_enabled() and self.temperature <= 0.2:
+            cache_key = self._cache_key(messages)
+            cached = llm_cache.get(cache_key)
+            if cached:
+                return cached
+        # Semantic cache: catches near-duplicate prompts (whitespace changes,
+        # small QA-feedback deltas) that the exact-match cache misses. The
+        # system prompt hash keys the context so hits never cross agents.
+        semantic_text = None
+        semantic_context = None
+        if semantic_cache.is_enabled() and self.temperature <= 0.3 and messages:
+            semantic_text = messages[-1].get("content", "")
+            system_content = messages[0].get("content", "") if messages[0].get("role") == "system" else ""
+            semantic_context = hashlib.sha256(
+                f"{self.provider}|{self.model_name}|{system_content}".encode("utf-8")
+            ).hexdigest()
+            cached = semantic_cache.lookup(semantic_text, semantic_context)
+            if cached:
+                return cached
         try:
-            result: str = ""
-            provider_lower = self.provider.lower()
-            if provider_lower == "openrouter":
-                result = self._invoke_openrouter(messages)
-            elif provider_lower in ("deepseek", "openai-compatible", "openai"):
-                result = self._invoke_openai_compatible(messages)
-            elif provider_lower in ("google-gemini", "gemini", "google"):
-                result = self._invoke_gemini(messages)
+            # Opt-in fan-out: race primary and Gemini and take the first
+            # non-empty answer (not compatible with streaming callbacks)
+            if (on_delta is None
+                    and os.getenv("LLM_RACE_FALLBACK", "0") == "1"
+                    and self.gemini_api_key
+                    and self.provider.lower() not in ("google-gemini", "gemini", "google")):
+                result = self._invoke_racing(messages)
             else:
-                result = self._invoke_openai_compatible(messages)
+                result = self._invoke_primary(messages, on_delta=on_delta)
 
             # Treat empty/whitespace-only responses as failure and fallback to Gemini
             if not isinstance(result, str) or not result.strip():
-                return self._invoke_gemini(messages)
-            return result
+                result = self._invoke_gemini(messages)
         except Exception as e:
             # Fallback to Gemini if configured; also write error to outputs for debugging
             try:
                 write_file_to_outputs(file_path="_debug_errors.txt", content=f"Primary provider {self.provider} failed: {str(e)}")
             except Exception:
                 pass
-            return self._invoke_gemini(messages)
+            result = self._invoke_gemini(messages)
+        if isinstance(result, str) and result.strip():
+            if cache_key:
+                llm_cache.set(cache_key, result)
+            if semantic_text is not None and semantic_context is not None:
+                semantic_cache.store(semantic_text, semantic_context, result)
+        return result
 
 
 # Per-agent configurable providers
@@ -198,28 +445,56 @@ qa_llm = MultiLLM(env_prefix="QA")
 class GraphState(TypedDict, total=False):
     product_requirements: str
     code_files: Dict[str, str]
+    code_files_prev: Dict[str, str]
+    code_hash: str
+    prev_code_hash: str
+    stalled: bool
     qa_feedback: str
     iterations: int
     user_request: str
 
 
+# System prompts are immutable; build the message dicts once at import so the
+# per-call path only allocates the user message (and the shared dict can be
+# serialized from the same object every call).
+PLAN_SYS = (
+    "You are an elite Product Manager. Create a concise, actionable PRD that raises the bar on quality. "
+    "Focus on: clear scope, user stories with acceptance criteria, accessibility (ARIA, focus, keyboard), "
+    "responsiveness (mobile-first), and performance. Provide a file-by-file plan (HTML/CSS/JS only unless the user requests a framework). "
+    "Favor modern visual design (spacing, elevation, motion) while keeping the code simple to run locally. "
+    "Output MUST be a single, well-structured markdown string."
+)
+CODE_SYS = (
+    "You are a Senior Frontend Engineer. Based on the PRD, produce production-quality HTML/CSS/JS. "
+    "Requirements: responsive layout (mobile-first), strong accessibility (labels, roles, ARIA, focus states), "
+    "clean architecture (small modular functions), graceful error handling, smooth micro-interactions (CSS transitions), "
+    "modern visual design (Poppins or user-specified font; CSS variables; consistent spacing; elevation/shadows). "
+    "No heavy frameworks unless explicitly requested. Do not reference external build steps; must work by opening index.html. "
+    "If QA feedback is included, apply changes. Respond ONLY with a JSON object mapping filenames to file contents. "
+    "Example: {\"index.html\": \"...\", \"style.css\": \"...\", \"script.js\": \"...\"}"
+)
+QA_SYS = (
+    "You are a meticulous QA Engineer. Validate functionality against user stories and acceptance criteria. "
+    "Check: responsive layout (various widths), accessibility (labels, roles, landmarks, keyboard, focus), "
+    "visual quality (consistent spacing, color contrast), resilience (empty/invalid input, storage failures), and performance. "
+    "Fail for placeholder content or low fidelity. Output MUST be JSON: {tests_passed: boolean, feedback: string}."
+)
+
+PLAN_SYS_MSG = {"role": "system", "content": PLAN_SYS}
+CODE_SYS_MSG = {"role": "system", "content": CODE_SYS}
+QA_SYS_MSG = {"role": "system", "content": QA_SYS}
+
+
 def plan_node(state: GraphState) -> GraphState:
     user_request = state.get("user_request", "Create a simple to-do list app")
-    system_prompt = (
-        "You are an elite Product Manager. Create a concise, actionable PRD that raises the bar on quality. "
-        "Focus on: clear scope, user stories with acceptance criteria, accessibility (ARIA, focus, keyboard), "
-        "responsiveness (mobile-first), and performance. Provide a file-by-file plan (HTML/CSS/JS only unless the user requests a framework). "
-        "Favor modern visual design (spacing, elevation, motion) while keeping the code simple to run locally. "
-        "Output MUST be a single, well-structured markdown string."
-    )
     messages = [
-        {"role": "system", "content": system_prompt},
+        PLAN_SYS_MSG,
         {"role": "user", "content": user_request},
     ]
     prd_markdown = product_manager_llm.invoke(messages)
-    # Persist PRD for transparency/debugging
+    # Persist PRD for transparency/debugging (off the hot path)
     try:
-        write_prd(prd_markdown)
+        _IO_POOL.submit(write_prd, prd_markdown)
     except Exception:
         pass
     return {
@@ -229,38 +504,142 @@ def plan_node(state: GraphState) -> GraphState:
     }
 
 
-def _extract_json_block(text: str) -> str:
-    # Heuristic to extract the first JSON object from text
-    # 1) Prefer fenced ```json blocks
-    fence_json_start = text.find("```json")
-    if fence_json_start != -1:
-        fence_content_start = fence_json_start + len("```json")
-        fence_end = text.find("```", fence_content_start)
-        if fence_end != -1:
-            candidate = text[fence_content_start:fence_end].strip()
-            if candidate:
-                return candidate
+def _scan_json_string(text: str, start: int):
+    """Parse one JSON string literal starting at text[start] == '\"'.
+
+    Returns (decoded_value, index_after_closing_quote) or None if the literal
+    is still incomplete (mid-stream) or malformed.
+    """
+    i = start + 1
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == '"':
+            try:
+                return _json_loads(text[start:i + 1]), i + 1
+            except Exception:
+                return None
+        i += 1
+    return None
+
+
+class _IncrementalFileEmitter:
+    """Extracts top-level "filename": "content" pairs from a streaming JSON
+    object and writes each file to outputs/ as soon as its value closes, so
+    disk writes overlap with network receive. Best-effort only: code_node
+    still runs the full parse on the complete response afterwards.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._in_object = False
+        self.emitted: Dict[str, str] = {}
+
+    def feed(self, piece: str) -> None:
+        self._text += piece
+        try:
+            self._drain()
+        except Exception:
+            pass
+
+    def _drain(self) -> None:
+        text = self._text
+        if not self._in_object:
+            start = text.find("{", self._pos)
+            if start == -1:
+                return
+            self._in_object = True
+            self._pos = start + 1
+        n = len(text)
+        while True:
+            i = self._pos
+            while i < n and text[i] in " \t\r\n,":
+                i += 1
+            if i >= n or text[i] != '"':
+                # Incomplete, closed object, or a shape we don't stream-parse;
+                # the final full parse handles it.
+                return
+            key_parsed = _scan_json_string(text, i)
+            if key_parsed is None:
+                return
+            key, j = key_parsed
+            while j < n and text[j] in " \t\r\n":
+                j += 1
+            if j >= n or text[j] != ":":
+                return
+            j += 1
+            while j < n and text[j] in " \t\r\n":
+                j += 1
+            if j >= n or text[j] != '"':
+                # Non-string value: stop incremental emission for this stream
+                return
+            value_parsed = _scan_json_string(text, j)
+            if value_parsed is None:
+                return
+            value, self._pos = value_parsed
+            self.emitted[key] = value
+            try:
+                write_file_to_outputs(file_path=key, content=value)
+            except Exception:
+                pass
+
 
-    # 2) Fallback to any fenced block
-    fence_any_start = text.find("```")
-    if fence_any_start != -1:
-        fence_any_content_start = fence_any_start + len("```")
-        fence_any_end = text.find("```", fence_any_content_start)
-        if fence_any_end != -1:
-            candidate = text[fence_any_content_start:fence_any_end].strip()
-            if candidate.startswith("{") and candidate.rstrip().endswith("}"):
+def _extract_json_block(text: str) -> str:
+    # Heuristic to extract the first JSON object from text, in one forward
+    # pass: each region is examined at most once (no repeated whole-text
+    # scans). Preference order is unchanged: ```json fence, then any fenced
+    # {...} block, then the widest {...} span.
+    n = len(text)
+    i = 0
+    fence_candidate = None
+    first_brace = -1
+    last_brace = -1
+    while i < n:
+        ch = text[i]
+        if ch == "`" and text.startswith("```", i):
+            is_json_fence = text.startswith("```json", i)
+            content_start = i + (len("```json") if is_json_fence else len("```"))
+            fence_end = text.find("```", content_start)
+            if fence_end == -1:
+                # Unterminated fence: fall through to plain brace tracking
+                i = content_start
+                continue
+            candidate = text[content_start:fence_end].strip()
+            if is_json_fence and candidate:
                 return candidate
+            if fence_candidate is None and candidate.startswith("{") and candidate.endswith("}"):
+                fence_candidate = candidate
+            # Keep brace bookkeeping for the skipped region (bounded scans,
+            # each byte still visited once overall)
+            if first_brace == -1:
+                fence_brace = text.find("{", content_start, fence_end)
+                if fence_brace != -1:
+                    first_brace = fence_brace
+            fence_close = text.rfind("}", content_start, fence_end)
+            if fence_close > last_brace:
+                last_brace = fence_close
+            i = fence_end + len("```")
+            continue
+        if ch == "{":
+            if first_brace == -1:
+                first_brace = i
+        elif ch == "}":
+            last_brace = i
+        i += 1
+
+    if fence_candidate is not None:
+        return fence_candidate
+    if first_brace != -1 and last_brace > first_brace:
+        return text[first_brace:last_brace + 1]
 
-    # 3) As a last resort, grab the first {...} span
-    start = text.find("{")
-    end = text.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        return text[start:end + 1]
-    
     # If no JSON found, try to find code blocks or create a simple structure
     if "html" in text.lower() or "css" in text.lower() or "javascript" in text.lower():
         # Create a simple structure from the text
-        return json.dumps({
+        return _json_dumps({
             "index.html": f"<!-- Generated from: {text[:200]}... -->\n<html><body><h1>Generated App</h1><p>Content: {text}</p></body></html>",
             "style.css": "body { font-family: Arial, sans-serif; margin: 20px; }",
             "script.js": "console.log('App loaded');"
@@ -285,29 +664,23 @@ def code_node(state: GraphState) -> GraphState:
     prd = state.get("product_requirements", "")
     qa_feedback = state.get("qa_feedback", "")
 
-    system_prompt = (
-        "You are a Senior Frontend Engineer. Based on the PRD, produce production-quality HTML/CSS/JS. "
-        "Requirements: responsive layout (mobile-first), strong accessibility (labels, roles, ARIA, focus states), "
-        "clean architecture (small modular functions), graceful error handling, smooth micro-interactions (CSS transitions), "
-        "modern visual design (Poppins or user-specified font; CSS variables; consistent spacing; elevation/shadows). "
-        "No heavy frameworks unless explicitly requested. Do not reference external build steps; must work by opening index.html. "
-        "If QA feedback is included, apply changes. Respond ONLY with a JSON object mapping filenames to file contents. "
-        "Example: {\"index.html\": \"...\", \"style.css\": \"...\", \"script.js\": \"...\"}"
-    )
     user_prompt = (
         f"PRD (markdown):\n{prd}\n\n"
         f"QA feedback (JSON or text, may be empty):\n{qa_feedback}\n\n"
         "Return ONLY the JSON object mapping filenames to contents."
     )
     messages = [
-        {"role": "system", "content": system_prompt},
+        CODE_SYS_MSG,
         {"role": "user", "content": user_prompt},
     ]
-    raw = coder_llm.invoke(messages)
+    # Stream the coder response (when the provider supports it) and emit files
+    # as their JSON values complete, overlapping network RX with disk I/O
+    emitter = _IncrementalFileEmitter()
+    raw = coder_llm.invoke(messages, on_delta=emitter.feed)
     if not isinstance(raw, str) or not raw.strip():
         # Retry once with a stricter instruction
         strict_messages = [
-            {"role": "system", "content": system_prompt},
+            CODE_SYS_MSG,
             {"role": "user", "content": user_prompt + "\n\nIMPORTANT: Return ONLY a valid JSON object mapping filenames to contents. No prose, no code fences."},
         ]
         try:
@@ -319,17 +692,18 @@ def code_node(state: GraphState) -> GraphState:
                 write_file_to_outputs(file_path="_debug_errors.txt", content=f"Coder strict retry failed: {str(e)}")
             except Exception:
                 pass
-    # Persist raw output before any parsing to aid debugging
+    # Persist raw output before any parsing to aid debugging; submitted to the
+    # I/O pool so JSON extraction proceeds without waiting on the disk write
     try:
-        debug_payload = raw if isinstance(raw, str) else json.dumps(raw)
+        debug_payload = raw if isinstance(raw, str) else _json_dumps(raw)
         if not debug_payload:
             debug_payload = "<empty response from coder model>"
-        write_file_to_outputs(file_path="_debug_raw_coder_output.txt", content=debug_payload)
+        _IO_POOL.submit(write_file_to_outputs, "_debug_raw_coder_output.txt", debug_payload)
     except Exception:
         pass
     json_text = _extract_json_block(raw)
     try:
-        files: Dict[str, str] = json.loads(json_text)
+        files: Dict[str, str] = _json_loads(json_text)
     except Exception as e:
         # Fallback: create a neutral scaffold instead of a to-do app
         files = {
@@ -379,41 +753,85 @@ p { color: #555; }
 });"""
         }
 
-    # Write files to outputs and update state
-    for path, content in files.items():
-        write_file_to_outputs(file_path=path, content=content)
-
-    current = dict(state.get("code_files", {}))
-    current.update(files)
-    return {**state, "code_files": current}
+    # Write only files that actually changed since the last iteration; QA
+    # loops often return some artifacts byte-identical and rewriting them
+    # wastes syscalls (and retriggers anything watching outputs/)
+    prev = state.get("code_files") or {}
+    changed = {path: content for path, content in files.items() if prev.get(path) != content}
+    if changed:
+        write_files_bulk(changed)
+
+    # Single-expression merge: one dict build instead of copy-then-update
+    merged = {**prev, **files}
+    code_hash = hashlib.sha1(_json_dumps(merged, sort_keys=True).encode("utf-8")).hexdigest()
+    return {**state, "code_files": merged, "code_hash": code_hash}
+
+
+def _qa_code_payload(prev: Dict[str, str], current: Dict[str, str]) -> str:
+    """Serialize code_files for the QA prompt.
+
+    The first iteration sends the full JSON mapping. Later iterations send a
+    unified diff per changed file (when the diff is meaningfully smaller than
+    the file) so small fixes don't re-upload every artifact in full.
+    """
+    if not prev:
+        return _json_dumps(current)
+    sections: List[str] = []
+    for path in sorted(current):
+        content = current[path]
+        before = prev.get(path)
+        if before == content:
+            sections.append(f"--- UNCHANGED {path} (identical to previous iteration) ---")
+            continue
+        if before is not None:
+            diff = "".join(difflib.unified_diff(
+                before.splitlines(keepends=True),
+                content.splitlines(keepends=True),
+                fromfile=f"{path} (previous)",
+                tofile=f"{path} (current)",
+                n=2,
+            ))
+            if diff and len(diff) < 0.4 * len(content):
+                sections.append(f"--- DIFF FOR {path} ---\n{diff}")
+                continue
+        sections.append(f"--- FULL CONTENT {path} ---\n{content}")
+    for path in sorted(set(prev) - set(current)):
+        sections.append(f"--- REMOVED {path} ---")
+    return "\n\n".join(sections)
 
 
 def qa_node(state: GraphState) -> GraphState:
     code_files = state.get("code_files", {})
     prd = state.get("product_requirements", "")
-    system_prompt = (
-        "You are a meticulous QA Engineer. Validate functionality against user stories and acceptance criteria. "
-        "Check: responsive layout (various widths), accessibility (labels, roles, landmarks, keyboard, focus), "
-        "visual quality (consistent spacing, color contrast), resilience (empty/invalid input, storage failures), and performance. "
-        "Fail for placeholder content or low fidelity. Output MUST be JSON: {tests_passed: boolean, feedback: string}."
-    )
+
+    # The coder returned byte-identical files (common when QA feedback was
+    # vague): re-reviewing them would waste a full LLM round trip. Reuse the
+    # cached verdict and mark the loop as stalled so should_continue ends it.
+    code_hash = state.get("code_hash")
+    if code_hash and code_hash == state.get("prev_code_hash") and state.get("qa_feedback"):
+        iterations = (state.get("iterations") or 0) + 1
+        return {**state, "iterations": iterations, "code_files_prev": code_files, "stalled": True}
+
     user_prompt = (
         "PRD (markdown):\n" + prd + "\n\n" +
-        "Code files (JSON mapping filename->content):\n" + json.dumps(code_files) + "\n\n" +
+        "Code files (full JSON mapping on the first pass; on later passes "
+        "unchanged files are marked UNCHANGED and edits arrive as unified "
+        "diffs vs the previous iteration):\n" +
+        _qa_code_payload(state.get("code_files_prev") or {}, code_files) + "\n\n" +
         "Return ONLY the JSON, nothing else."
     )
     messages = [
-        {"role": "system", "content": system_prompt},
+        QA_SYS_MSG,
         {"role": "user", "content": user_prompt},
     ]
     raw = qa_llm.invoke(messages)
     json_text = _extract_json_block(raw)
     try:
-        parsed = json.loads(json_text)
-        qa_json = json.dumps(parsed)
-        # Write QA log artifact
+        parsed = _json_loads(json_text)
+        qa_json = _json_dumps(parsed)
+        # Write QA log artifact in the background
         try:
-            write_qa_log(parsed)
+            _IO_POOL.submit(write_qa_log, parsed)
         except Exception:
             pass
     except Exception:
@@ -421,14 +839,16 @@ def qa_node(state: GraphState) -> GraphState:
             "tests_passed": False,
             "feedback": f"QA output not valid JSON. Raw: {json_text[:500]}"
         }
-        qa_json = json.dumps(fallback)
+        qa_json = _json_dumps(fallback)
         try:
-            write_qa_log(fallback)
+            _IO_POOL.submit(write_qa_log, fallback)
         except Exception:
             pass
 
     iterations = (state.get("iterations") or 0) + 1
-    return {**state, "qa_feedback": qa_json, "iterations": iterations}
+    # Snapshot what QA just reviewed so the next iteration can diff against it
+    return {**state, "qa_feedback": qa_json, "iterations": iterations,
+            "code_files_prev": code_files, "prev_code_hash": code_hash or ""}
 
 
 def should_continue(state: GraphState):
@@ -436,9 +856,12 @@ def should_continue(state: GraphState):
     iterations = state.get("iterations", 0)
     if iterations >= max_iters:
         return END
+    # Coder output stopped changing; further iterations can't improve it
+    if state.get("stalled"):
+        return END
     qa_feedback = state.get("qa_feedback", "")
     try:
-        parsed = json.loads(qa_feedback) if isinstance(qa_feedback, str) else qa_feedback
+        parsed = _json_loads(qa_feedback) if isinstance(qa_feedback, str) else qa_feedback
         if parsed.get("tests_passed") is True:
             return END
     except Exception:
@@ -480,7 +903,7 @@ if __name__ == "__main__":
     iterations_final = final_state.get("iterations", 0)
     tests_passed = False
     try:
-        qa_obj = json.loads(qa_feedback_raw) if isinstance(qa_feedback_raw, str) else qa_feedback_raw
+        qa_obj = _json_loads(qa_feedback_raw) if isinstance(qa_feedback_raw, str) else qa_feedback_raw
         tests_passed = bool(qa_obj.get("tests_passed", False))
     except Exception:
         pass
@@ -1,34 +1,108 @@
 import os
 import json
-from typing import Optional, Any
+import shutil
+from pathlib import Path
+from typing import Dict, Optional, Any
 
 
 OUTPUTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "outputs")
 
+# Path counterpart of OUTPUTS_DIR: the / operator and .parent avoid re-parsing
+# separator strings on every join/dirname call
+_OUTPUTS_PATH = Path(OUTPUTS_DIR)
+
+# Core generated artifacts targeted by the selective clean
+_CORE_FILES = frozenset({
+    'PRD.md', 'file_breakdown.json', 'index.html', 'style.css', 'script.js',
+    'qa_log.json', '_debug_raw_coder_output.txt', '_debug_errors.txt',
+})
+
+
+# Every file helper calls ensure_outputs_dir; skip the mkdir syscall once the
+# directory is known to exist in this process
+_OUTPUTS_READY = False
+
 
 def ensure_outputs_dir() -> None:
+    global _OUTPUTS_READY
+    if _OUTPUTS_READY:
+        return
     os.makedirs(OUTPUTS_DIR, exist_ok=True)
+    _OUTPUTS_READY = True
+
+
+def _resolve_outputs_path(file_path: str) -> Path:
+    """Map a caller-supplied relative path to an absolute path inside outputs/.
+
+    The old lstrip-only treatment did not defend against '..' traversal;
+    normalizing the joined path and checking containment pins the result
+    under OUTPUTS_DIR. Raises ValueError for paths that escape it.
+    """
+    abs_path = os.path.normpath(os.path.join(OUTPUTS_DIR, file_path.lstrip("/\\")))
+    if os.path.commonpath([OUTPUTS_DIR, abs_path]) != OUTPUTS_DIR:
+        raise ValueError(f"Path escapes outputs directory: {file_path}")
+    return Path(abs_path)
+
+
+def _ensure_parent_dir(abs_path: Path) -> None:
+    # Flat artifacts (index.html, style.css, ...) are the dominant case;
+    # skip the mkdir syscall when the parent is outputs/ itself
+    parent = abs_path.parent
+    if parent != _OUTPUTS_PATH:
+        parent.mkdir(parents=True, exist_ok=True)
 
 
 def write_file_to_outputs(file_path: str, content: Optional[Any]) -> str:
     """Plain helper to write a file into outputs/ (callable directly by app)."""
     ensure_outputs_dir()
-    safe_relative_path = file_path.lstrip("/\\")
-    abs_path = os.path.join(OUTPUTS_DIR, safe_relative_path)
-    os.makedirs(os.path.dirname(abs_path), exist_ok=True)
-    # Coerce None or non-string content to a safe string
+    abs_path = _resolve_outputs_path(file_path)
+    _ensure_parent_dir(abs_path)
+    # One up-front encode and one unbuffered binary write: large generated
+    # blobs skip the text-mode incremental encoder and buffered-IO layer
+    data = _coerce_content_bytes(content)
+    with open(abs_path, "wb", buffering=0) as f:
+        f.write(data)
+    return f"Wrote file to {abs_path}"
+
+
+def _coerce_content_bytes(content: Optional[Any]) -> bytes:
+    """Encode file content to UTF-8 bytes, tolerating None/non-string input."""
     if content is None:
-        safe_content: str = ""
-    elif isinstance(content, str):
-        safe_content = content
-    else:
+        return b""
+    if isinstance(content, str):
+        return content.encode("utf-8")
+    try:
+        return json.dumps(content, ensure_ascii=False).encode("utf-8")
+    except Exception:
+        return str(content).encode("utf-8")
+
+
+def write_files_bulk(files: Dict[str, Any]) -> None:
+    """Write a batch of generated files into outputs/ in one pass.
+
+    Contents are pre-encoded to UTF-8 bytes up front, then each file is
+    written to a temp sibling and moved into place with os.replace, so a
+    reader (or a crashed run) never observes a partially written artifact.
+
+    Paths that escape outputs/ (e.g. a model-emitted "../foo.html") are
+    skipped with a warning instead of aborting the batch; the pipeline's
+    other write paths are best-effort too.
+    """
+    ensure_outputs_dir()
+    encoded = []
+    for file_path, content in files.items():
         try:
-            safe_content = json.dumps(content, ensure_ascii=False)
-        except Exception:
-            safe_content = str(content)
-    with open(abs_path, "w", encoding="utf-8") as f:
-        f.write(safe_content)
-    return f"Wrote file to {abs_path}"
+            abs_path = _resolve_outputs_path(file_path)
+        except ValueError as e:
+            print(f"WARNING: skipping file write: {e}")
+            continue
+        encoded.append((abs_path, _coerce_content_bytes(content)))
+    for abs_path, data in encoded:
+        _ensure_parent_dir(abs_path)
+        tmp_path = abs_path.with_name(abs_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, abs_path)
 
 
 def clear_outputs_dir(remove_all: bool = False) -> None:
@@ -40,44 +114,28 @@ def clear_outputs_dir(remove_all: bool = False) -> None:
     """
     ensure_outputs_dir()
     if remove_all:
-        for name in os.listdir(OUTPUTS_DIR):
-            path = os.path.join(OUTPUTS_DIR, name)
-            if os.path.isdir(path):
-                # Best-effort recursive removal
-                for root, dirs, files in os.walk(path, topdown=False):
-                    for f in files:
-                        try:
-                            os.remove(os.path.join(root, f))
-                        except Exception:
-                            pass
-                    for d in dirs:
-                        try:
-                            os.rmdir(os.path.join(root, d))
-                        except Exception:
-                            pass
-                try:
-                    os.rmdir(path)
-                except Exception:
-                    pass
-            else:
-                try:
-                    os.remove(path)
-                except Exception:
-                    pass
+        # scandir dirents already carry the file type (no extra stat per
+        # entry) and shutil.rmtree removes subtrees in a tight C-level loop
+        with os.scandir(OUTPUTS_DIR) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    try:
+                        os.unlink(entry.path)
+                    except OSError:
+                        pass
         return
 
-    # Selective clean of typical generated files
-    core_files = [
-        'PRD.md', 'file_breakdown.json', 'index.html', 'style.css', 'script.js',
-        'qa_log.json', '_debug_raw_coder_output.txt', '_debug_errors.txt'
-    ]
-    for name in core_files:
-        path = os.path.join(OUTPUTS_DIR, name)
-        if os.path.exists(path):
-            try:
-                os.remove(path)
-            except Exception:
-                pass
+    # Selective clean of typical generated files: one directory listing
+    # intersected against the core names instead of a stat+unlink per name
+    with os.scandir(OUTPUTS_DIR) as entries:
+        for entry in entries:
+            if entry.name in _CORE_FILES and entry.is_file(follow_symlinks=False):
+                try:
+                    os.unlink(entry.path)
+                except OSError:
+                    pass
 
 
 def write_file_tool(file_path: str, content: Optional[Any]) -> str:
@@ -103,12 +161,13 @@ def read_file_from_outputs(file_path: str) -> str:
         File content as string.
     """
     ensure_outputs_dir()
-    safe_relative_path = file_path.lstrip("/\\")
-    abs_path = os.path.join(OUTPUTS_DIR, safe_relative_path)
-    if not os.path.exists(abs_path):
+    try:
+        abs_path = _resolve_outputs_path(file_path)
+    except ValueError as e:
+        return f"ERROR: {e}"
+    if not abs_path.exists():
         return f"ERROR: File does not exist: {abs_path}"
-    with open(abs_path, "r", encoding="utf-8") as f:
-        return f.read()
+    return abs_path.read_text(encoding="utf-8")
 
 
 def read_file_tool(file_path: str) -> str:
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+
+# Cache lives at the repo root so it survives output cleanups between runs.
+REPO_ROOT = Path(__file__).resolve().parents[2]
+CACHE_DB_PATH = REPO_ROOT / ".llm_cache" / "responses.db"
+
+# Entries older than this are treated as misses (seconds).
+CACHE_TTL_SECONDS = 86400
+
+_connection: Optional[sqlite3.Connection] = None
+
+
+def is_enabled() -> bool:
+    """Caching is opt-in via LLM_CACHE=1 to keep default behavior unchanged."""
+    return os.getenv("LLM_CACHE", "0") == "1"
+
+
+def _get_connection() -> sqlite3.Connection:
+    global _connection
+    if _connection is None:
+        CACHE_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _connection = sqlite3.connect(str(CACHE_DB_PATH))
+        _connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, ts INTEGER NOT NULL)"
+        )
+        _connection.commit()
+    return _connection
+
+
+def get(key: str) -> Optional[str]:
+    """Return the cached response for key, or None on miss/expiry/error."""
+    try:
+        conn = _get_connection()
+        row = conn.execute(
+            "SELECT value, ts FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+    except Exception:
+        return None
+    if row is None:
+        return None
+    value, ts = row
+    if time.time() - ts > CACHE_TTL_SECONDS:
+        try:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+        except Exception:
+            pass
+        return None
+    return value if value else None
+
+
+def set(key: str, value: str) -> None:
+    """Store a response; best-effort only (errors never break the pipeline)."""
+    if not value:
+        return
+    try:
+        conn = _get_connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, ts) VALUES (?, ?, ?)",
+            (key, value, int(time.time())),
+        )
+        conn.commit()
+    except Exception:
+        pass
@@ -1,21 +1,40 @@
 import json
 import os
-from datetime import datetime
+import time
+
+# Optional fast JSON encoder; stdlib remains the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from .file_tools import ensure_outputs_dir, write_file_to_outputs
 
 
+def _json_dumps_indented(obj) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+        except Exception:
+            pass
+    return json.dumps(obj, indent=2)
+
+
 def _timestamp() -> str:
-    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    # f-string formatting of time.gmtime() skips datetime object creation and
+    # strftime's locale machinery (and avoids the utcnow deprecation in 3.12+)
+    t = time.gmtime()
+    return (f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+            f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}Z")
 
 
 def write_qa_log(qa_json: dict) -> None:
     ensure_outputs_dir()
     try:
-        content = json.dumps({
+        content = _json_dumps_indented({
             "timestamp": _timestamp(),
             "qa": qa_json,
-        }, indent=2)
+        })
         write_file_to_outputs(file_path="qa_log.json", content=content)
     except Exception:
         # Best-effort only
@@ -39,7 +58,7 @@ def write_metrics(metrics: dict) -> None:
             "timestamp": _timestamp(),
             "latest": metrics,
         }
-        write_file_to_outputs(file_path="metrics.json", content=json.dumps(payload, indent=2))
+        write_file_to_outputs(file_path="metrics.json", content=_json_dumps_indented(payload))
     except Exception:
         pass
 
@@ -0,0 +1,70 @@
+import math
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+# Near-duplicate prompts (whitespace tweaks, small QA-feedback deltas) miss the
+# exact-match cache. This layer embeds the latest user message as a normalized
+# token-frequency vector and returns a cached response when cosine similarity
+# exceeds the threshold. A hash of the system prompt is stored alongside each
+# entry so hits never cross agent contexts (plan vs code vs QA).
+#
+# The embedding is deliberately lexical (bag of tokens) rather than a neural
+# model: it needs no extra dependencies and is more than enough to catch the
+# whitespace/small-delta duplicates this pipeline actually produces.
+
+SIMILARITY_THRESHOLD = 0.95
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Each entry: (token->weight vector, context_hash, response_text)
+_entries: List[Tuple[Dict[str, float], str, str]] = []
+
+
+def is_enabled() -> bool:
+    """Semantic caching is opt-in via LLM_SEMANTIC_CACHE=1."""
+    return os.getenv("LLM_SEMANTIC_CACHE", "0") == "1"
+
+
+def _embed(text: str) -> Dict[str, float]:
+    counts: Dict[str, float] = {}
+    for token in _TOKEN_RE.findall(text.lower()):
+        counts[token] = counts.get(token, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in counts.values()))
+    if norm > 0:
+        for token in counts:
+            counts[token] /= norm
+    return counts
+
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(b) < len(a):
+        a, b = b, a
+    return sum(weight * b.get(token, 0.0) for token, weight in a.items())
+
+
+def lookup(text: str, context_hash: str) -> Optional[str]:
+    """Return a cached response for a near-duplicate of text, or None."""
+    if not _entries:
+        return None
+    vector = _embed(text)
+    best_score = 0.0
+    best_response: Optional[str] = None
+    for entry_vector, entry_context, response in _entries:
+        if entry_context != context_hash:
+            continue
+        score = _cosine(vector, entry_vector)
+        if score > best_score:
+            best_score = score
+            best_response = response
+    if best_score > SIMILARITY_THRESHOLD:
+        return best_response
+    return None
+
+
+def store(text: str, context_hash: str, response: str) -> None:
+    """Record a response for future near-duplicate lookups."""
+    if not response or not response.strip():
+        return
+    _entries.append((_embed(text), context_hash, response))
@@ -1,11 +1,16 @@
+import functools
+import os
 import re
+import selectors
 import sys
 import subprocess
+import time
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 
 import streamlit as st
-from dotenv import find_dotenv, load_dotenv, set_key
+from dotenv import find_dotenv
 
 
 REPO_ROOT = Path(__file__).resolve().parents[2]
@@ -13,32 +18,115 @@ OUTPUTS_DIR = REPO_ROOT / 'ai_dev_team' / 'outputs'
 OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
 
 
+_HEX_RE = re.compile(r"#(?:[0-9a-fA-F]{6}|[0-9a-fA-F]{3})")
+
+
 def is_valid_hex_color(value: str) -> bool:
-    return bool(re.fullmatch(r"#([0-9a-fA-F]{6}|[0-9a-fA-F]{3})", value.strip()))
+    return _HEX_RE.fullmatch(value.strip()) is not None
+
+
+_USER_REQ_RE = re.compile(r'^USER_PRODUCT_REQUEST=(.*)$', re.M)
+
+
+@functools.lru_cache(maxsize=1)
+def _env_path() -> str:
+    """Resolve the .env path once per process; find_dotenv walks the
+    directory tree with a stat per level on every call otherwise."""
+    return find_dotenv(usecwd=True) or str(REPO_ROOT / '.env')
+
+# {env_path: (mtime_ns, value)} — Streamlit reruns this module's functions on
+# every widget interaction, so .env is only re-read when it actually changes
+_ENV_CACHE = {}
+
+
+def _fast_set_user_request(env_path: str, value: str) -> None:
+    """Overwrite (or append) USER_PRODUCT_REQUEST in .env with one regex pass.
+
+    python-dotenv's set_key re-parses every line of the file through its
+    general-purpose parser; this module only ever writes this single key, so
+    a substitution on the precompiled pattern is all that's needed. The mtime
+    cache is primed in-process so the next read returns without re-reading.
+    """
+    # Newlines must be escaped too: text_area values can span lines, and a
+    # raw newline inside the quotes would break the single-line regex (here
+    # and in read_existing_user_request). python-dotenv unescapes \n/\r
+    # inside double-quoted values on load.
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+    escaped = escaped.replace('\n', '\\n').replace('\r', '\\r')
+    line = f'USER_PRODUCT_REQUEST="{escaped}"'
+    env_file = Path(env_path)
+    try:
+        text = env_file.read_text(encoding='utf-8')
+    except OSError:
+        text = ''
+    new_text, n = _USER_REQ_RE.subn(lambda _m: line, text, count=1)
+    if n == 0:
+        if text and not text.endswith('\n'):
+            text += '\n'
+        new_text = text + line + '\n'
+    env_file.write_text(new_text, encoding='utf-8')
+    _ENV_CACHE[env_path] = (env_file.stat().st_mtime_ns, value)
 
 
 def read_existing_user_request() -> str:
-    load_dotenv()
-    env_path = find_dotenv(usecwd=True) or str(REPO_ROOT / '.env')
+    env_path = _env_path()
     env_file = Path(env_path)
-    if env_file.exists():
-        # Fallback manual read to show in UI without parsing all keys
-        try:
-            for line in env_file.read_text(encoding='utf-8').splitlines():
-                if line.startswith('USER_PRODUCT_REQUEST='):
-                    return line.split('=', 1)[1].strip().strip('"')
-        except Exception:
-            pass
-    return ''
+    try:
+        mtime_ns = env_file.stat().st_mtime_ns
+    except OSError:
+        return ''
+    cached = _ENV_CACHE.get(env_path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    value = ''
+    try:
+        match = _USER_REQ_RE.search(env_file.read_text(encoding='utf-8'))
+        if match:
+            value = match.group(1).strip().strip('"')
+            # Reverse the escaping applied by _fast_set_user_request
+            value = (value.replace('\\n', '\n').replace('\\r', '\r')
+                     .replace('\\"', '"').replace('\\\\', '\\'))
+    except Exception:
+        pass
+    _ENV_CACHE[env_path] = (mtime_ns, value)
+    return value
+
+
+# Artifacts the pipeline is known to produce, in display order
+_ARTIFACT_NAMES = (
+    'PRD.md', 'file_breakdown.json', 'index.html', 'style.css', 'script.js',
+    'qa_log.json', '_debug_raw_coder_output.txt', '_debug_errors.txt',
+)
+
+
+@st.cache_data(show_spinner=False)
+def _read_artifact(path_str: str, mtime_ns: int) -> bytes:
+    """Read an artifact once per content version (mtime) instead of on every
+    rerun; streamlit 1.38 requires download_button data eagerly."""
+    return Path(path_str).read_bytes()
 
 
-def save_user_product_request(request_str: str) -> None:
-    env_path = find_dotenv(usecwd=True) or str(REPO_ROOT / '.env')
-    if not env_path:
-        env_path = str(REPO_ROOT / '.env')
+@st.cache_data(show_spinner=False)
+def _discover_artifacts(dir_mtime_ns: int) -> dict:
+    """Map artifact names to paths for files present in OUTPUTS_DIR.
 
-    # Backup existing value
-    prev = read_existing_user_request()
+    Keyed on the directory mtime so Streamlit reruns reuse the cached result
+    until the pipeline actually writes new files.
+    """
+    return {
+        name: str(OUTPUTS_DIR / name)
+        for name in _ARTIFACT_NAMES
+        if (OUTPUTS_DIR / name).exists()
+    }
+
+
+def save_user_product_request(request_str: str, prev: 'str | None' = None) -> None:
+    env_path = _env_path()
+
+    # Backup existing value; callers that already read it pass it in so the
+    # save path doesn't re-resolve and re-read .env
+    if prev is None:
+        prev = read_existing_user_request()
     if prev:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         backup_path = OUTPUTS_DIR / f'user_product_request_{timestamp}.txt'
@@ -49,17 +137,22 @@ def save_user_product_request(request_str: str) -> None:
     if not env_file.exists():
         env_file.write_text('', encoding='utf-8')
 
-    # Write key safely
-    set_key(env_path, 'USER_PRODUCT_REQUEST', request_str)
+    # Write the key; the helper updates the mtime cache itself
+    _fast_set_user_request(env_path, request_str)
 
 
 def main() -> None:
     st.set_page_config(page_title='Generator Control', page_icon='🧩', layout='centered')
 
+    # Non-blocking font load: preconnect + stylesheet link with display=swap
+    # instead of a render-blocking CSS @import, and only the two weights we
+    # actually use. The system fonts in the fallback chain render immediately.
     st.markdown(
         """
+        <link rel='preconnect' href='https://fonts.googleapis.com'>
+        <link rel='preconnect' href='https://fonts.gstatic.com' crossorigin>
+        <link href='https://fonts.googleapis.com/css2?family=Poppins:wght@400;600&display=swap' rel='stylesheet'>
         <style>
-        @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600&display=swap');
         html, body, [class*="css"]  {
             font-family: 'Poppins', system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif;
         }
@@ -111,7 +204,7 @@ def main() -> None:
         composed = ' '.join(parts)
 
         try:
-            save_user_product_request(composed)
+            save_user_product_request(composed, prev=read_existing_user_request())
             st.success('USER_PRODUCT_REQUEST saved to .env')
             st.code(composed)
             st.info('You can now start generation below.')
@@ -136,21 +229,60 @@ def main() -> None:
         log_area = st.empty()
         with st.status('Running pipeline...', expanded=True) as status:
             try:
-                cmd = [sys.executable, '-m', 'ai_dev_team.main']
+                # -u / PYTHONUNBUFFERED make the child flush stdout per write;
+                # without it, a non-tty child block-buffers 4-8 KB and the
+                # live log stalls regardless of parent-side buffering
+                cmd = [sys.executable, '-u', '-m', 'ai_dev_team.main']
                 proc = subprocess.Popen(
                     cmd,
                     cwd=str(REPO_ROOT),
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
-                    text=True,
-                    bufsize=1,
-                    universal_newlines=True,
+                    bufsize=-1,
+                    env={**os.environ, 'PYTHONUNBUFFERED': '1'},
                 )
-                lines = []
-                for line in proc.stdout:
-                    lines.append(line.rstrip('\n'))
-                    # Render last ~200 lines to keep UI snappy
-                    log_area.code('\n'.join(lines[-200:]))
+                # Read stdout in large chunks and batch UI redraws: a
+                # per-line log_area.code() forces a websocket round trip per
+                # line, which dominates runtime for chatty pipelines.
+                # Only the last 200 lines are ever rendered; a bounded deque
+                # drops the head in O(1) instead of growing without limit
+                lines = deque(maxlen=200)
+                pending = bytearray()
+                unflushed = 0
+                last_flush = time.monotonic()
+                fd = proc.stdout.fileno()
+                sel = selectors.DefaultSelector()
+                sel.register(proc.stdout, selectors.EVENT_READ)
+                try:
+                    eof = False
+                    while not eof:
+                        for _event in sel.select(timeout=0.1):
+                            chunk = os.read(fd, 65536)
+                            if not chunk:
+                                eof = True
+                                break
+                            parts = (pending + chunk).split(b'\n')
+                            pending = bytearray(parts.pop())
+                            # A chunk without a newline leaves parts empty;
+                            # splitting the empty decode would append a
+                            # spurious blank line per chunk
+                            if parts:
+                                # Decode once per batch, not per line
+                                decoded = b'\n'.join(parts).decode('utf-8', 'replace')
+                                new_lines = decoded.split('\n')
+                                lines.extend(new_lines)
+                                unflushed += len(new_lines)
+                        now = time.monotonic()
+                        if unflushed and (unflushed >= 50 or now - last_flush > 0.1):
+                            log_area.code('\n'.join(lines))
+                            last_flush = now
+                            unflushed = 0
+                finally:
+                    sel.close()
+                if pending:
+                    lines.append(pending.decode('utf-8', 'replace'))
+                if lines:
+                    log_area.code('\n'.join(lines))
                 ret = proc.wait()
                 if ret == 0:
                     status.update(label='Pipeline completed', state='complete')
@@ -161,17 +293,11 @@ def main() -> None:
                 st.exception(e)
 
         # After run, show quick links if exist
-        outputs = {
-            'PRD.md': OUTPUTS_DIR / 'PRD.md',
-            'file_breakdown.json': OUTPUTS_DIR / 'file_breakdown.json',
-            'index.html': OUTPUTS_DIR / 'index.html',
-            'style.css': OUTPUTS_DIR / 'style.css',
-            'script.js': OUTPUTS_DIR / 'script.js',
-            'qa_log.json': OUTPUTS_DIR / 'qa_log.json',
-            '_debug_raw_coder_output.txt': OUTPUTS_DIR / '_debug_raw_coder_output.txt',
-            '_debug_errors.txt': OUTPUTS_DIR / '_debug_errors.txt',
-        }
-        available = {name: p for name, p in outputs.items() if p.exists()}
+        try:
+            dir_mtime_ns = OUTPUTS_DIR.stat().st_mtime_ns
+        except OSError:
+            dir_mtime_ns = 0
+        available = {name: Path(p) for name, p in _discover_artifacts(dir_mtime_ns).items()}
         if available:
             st.success('Artifacts generated:')
             cols = st.columns(2)
@@ -182,7 +308,7 @@ def main() -> None:
                     try:
                         st.download_button(
                             label=f'Download {name}',
-                            data=path.read_bytes(),
+                            data=_read_artifact(str(path), path.stat().st_mtime_ns),
                             file_name=name,
                         )
                     except Exception: